@@ -48,7 +48,7 @@ class GeneralStaticGraphToDGLGraph:
         if len(static_graph.data) > 0:
             setattr(dgl_graph, "graph_data", dict(static_graph.data))
             if "gf" in static_graph.data:
-                setattr(dgl_graph, "gf", static_graph.data["gf"].detach().clone())
+                setattr(dgl_graph, "gf", static_graph.data["gf"].detach())
         return dgl_graph
 
 
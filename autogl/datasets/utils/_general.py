@@ -3,6 +3,7 @@ import random
 import torch
 import torch.utils.data
 import typing as _typing
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.model_selection import StratifiedKFold, KFold
 from autogl import backend as _backend
 from autogl.data import InMemoryDataset
@@ -14,10 +15,46 @@ def index_to_mask(index: torch.Tensor, size):
     return mask
 
 
+def _map_split_tasks(
+        function: _typing.Callable, tasks: _typing.Sequence[_typing.Tuple], num_workers: int
+) -> _typing.List:
+    if num_workers > 0 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            return list(executor.map(function, *zip(*tasks)))
+    else:
+        return [function(*task) for task in tasks]
+
+
+def _random_split_masks(
+        num_nodes: int, train_ratio: float, val_ratio: float,
+        seed: _typing.Optional[int] = None,
+        rng_state: _typing.Optional[torch.Tensor] = None
+) -> _typing.Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    _rng_state: torch.Tensor = torch.get_rng_state()
+    if seed is not None and isinstance(seed, int):
+        torch.manual_seed(seed)
+    elif rng_state is not None:
+        torch.set_rng_state(rng_state)
+    # the nodes with the smallest random keys form a uniformly random subset,
+    # which is only shuffled itself to be divided into train and validation
+    train_val_index: torch.Tensor = torch.topk(
+        torch.rand(num_nodes), int(num_nodes * (train_ratio + val_ratio)),
+        largest=False, sorted=False
+    )[1]
+    train_val_index = train_val_index[torch.randperm(train_val_index.size(0))]
+    torch.set_rng_state(_rng_state)
+    # 0 for train, 1 for validation and 2 for test
+    split = torch.full((num_nodes,), 2, dtype=torch.int8)
+    split[train_val_index[:int(num_nodes * train_ratio)]] = 0
+    split[train_val_index[int(num_nodes * train_ratio):]] = 1
+    return split == 0, split == 1, split == 2
+
+
 def random_splits_mask(
         dataset: InMemoryDataset,
         train_ratio: float = 0.2, val_ratio: float = 0.4,
-        seed: _typing.Optional[int] = None
+        seed: _typing.Optional[int] = None,
+        num_workers: int = 0
 ) -> InMemoryDataset:
     r"""If the data has masks for train/val/test, return the splits with specific ratio.
 
@@ -33,48 +70,115 @@ def random_splits_mask(
 
     seed : int
         random seed for splitting dataset.
+
+    num_workers : int
+        number of worker processes to split the graphs in parallel,
+        default to 0 for splitting in the main process.
     """
     if not train_ratio + val_ratio <= 1:
         raise ValueError("the sum of provided train_ratio and val_ratio is larger than 1")
 
-    def __random_split_masks(
-            num_nodes: int
-    ) -> _typing.Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
-        _rng_state: torch.Tensor = torch.get_rng_state()
-        if seed is not None and isinstance(seed, int):
-            torch.manual_seed(seed)
-        perm = torch.randperm(num_nodes)
-        train_index = perm[:int(num_nodes * train_ratio)]
-        val_index = perm[int(num_nodes * train_ratio): int(num_nodes * (train_ratio + val_ratio))]
-        test_index = perm[int(num_nodes * (train_ratio + val_ratio)):]
-        torch.set_rng_state(_rng_state)
-        return (
-            index_to_mask(train_index, num_nodes),
-            index_to_mask(val_index, num_nodes),
-            index_to_mask(test_index, num_nodes)
-        )
-
+    split_targets: _typing.List[_typing.Tuple[int, str]] = []
+    split_tasks: _typing.List[_typing.Tuple] = []
+    # without a seed every split starts from the current generator state of the
+    # main process, which worker processes do not share
+    _rng_state: torch.Tensor = torch.get_rng_state()
     for index in range(len(dataset)):
-        for node_type in dataset[index].nodes:
-            data_keys = [data_key for data_key in dataset[index].nodes.data]
+        graph = dataset[index]
+        for node_type in graph.nodes:
+            data_keys = [data_key for data_key in graph.nodes.data]
             if len(data_keys) > 0:
-                _num_nodes: int = dataset[index].nodes[node_type].data[data_keys[0]].size(0)
-                _masks: _typing.Tuple[torch.Tensor, torch.Tensor, torch.Tensor] = (
-                    __random_split_masks(_num_nodes)
-                )
-                dataset[index].nodes[node_type].data["train_mask"] = _masks[0]
-                dataset[index].nodes[node_type].data["val_mask"] = _masks[1]
-                dataset[index].nodes[node_type].data["test_mask"] = _masks[2]
+                _num_nodes: int = graph.nodes[node_type].data[data_keys[0]].size(0)
+                split_targets.append((index, node_type))
+                split_tasks.append((_num_nodes, train_ratio, val_ratio, seed, _rng_state))
+    for (index, node_type), _masks in zip(
+            split_targets, _map_split_tasks(_random_split_masks, split_tasks, num_workers)
+    ):
+        node_data = dataset[index].nodes[node_type].data
+        node_data["train_mask"] = _masks[0]
+        node_data["val_mask"] = _masks[1]
+        node_data["test_mask"] = _masks[2]
     return dataset
 
 
+def _random_split_masks_by_class(
+        label: torch.Tensor,
+        num_train_per_class: int,
+        num_val_per_class: int,
+        total_num_val: _typing.Optional[int],
+        total_num_test: _typing.Optional[int],
+        seed: _typing.Optional[int],
+        description: str,
+        rng_state: _typing.Optional[torch.Tensor] = None
+) -> _typing.Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    num_nodes: int = label.size(0)
+
+    _rng_state: torch.Tensor = torch.get_rng_state()
+    if seed not in (Ellipsis, None) and isinstance(seed, int):
+        torch.manual_seed(seed)
+    elif rng_state is not None:
+        torch.set_rng_state(rng_state)
+    # group a random permutation of the labeled nodes by class, such that every
+    # class segment is shuffled independently in a single pass; the position
+    # breaks ties in the sort key, which keeps the random order within a class
+    randomized_index: torch.Tensor = torch.randperm(num_nodes).to(label.device)
+    randomized_index = randomized_index[label[randomized_index] >= 0]
+    randomized_label: torch.Tensor = label[randomized_index]
+    _order: torch.Tensor = torch.argsort(
+        randomized_label * randomized_index.size(0) +
+        torch.arange(randomized_index.size(0), device=label.device)
+    )
+    sorted_label: torch.Tensor = randomized_label[_order]
+    randomized_index = randomized_index[_order]
+    num_samples_per_class: torch.Tensor = torch.bincount(sorted_label)
+    insufficient_classes: torch.Tensor = (
+        num_samples_per_class <= num_train_per_class + num_val_per_class
+    ).nonzero().view(-1)
+    assert insufficient_classes.numel() == 0, (
+        f"the total number of samples from every class "
+        f"used for training and validation is larger than "
+        f"the total samples in class [{insufficient_classes[0].item()}] {description}"
+    )
+    rank_in_class: torch.Tensor = (
+        torch.arange(sorted_label.size(0), device=label.device) -
+        (torch.cumsum(num_samples_per_class, 0) - num_samples_per_class)[sorted_label]
+    )
+    train_mask = index_to_mask(
+        randomized_index[rank_in_class < num_train_per_class], num_nodes
+    )
+    val_mask = index_to_mask(
+        randomized_index[
+            (rank_in_class >= num_train_per_class) &
+            (rank_in_class < num_train_per_class + num_val_per_class)
+        ],
+        num_nodes
+    )
+    test_mask = torch.zeros(num_nodes, dtype=torch.bool, device=label.device)
+
+    if isinstance(total_num_val, int) and total_num_val > 0:
+        remaining = (~train_mask).nonzero().view(-1)
+        remaining = remaining[torch.randperm(remaining.size(0))]
+        val_mask[remaining[:total_num_val]] = True
+        if isinstance(total_num_test, int) and total_num_test > 0:
+            test_mask[remaining[total_num_val: (total_num_val + total_num_test)]] = True
+        else:
+            test_mask[remaining[total_num_val:]] = True
+    else:
+        remaining = (~(train_mask + val_mask)).nonzero().view(-1)
+        test_mask[remaining] = True
+
+    torch.set_rng_state(_rng_state)
+    return train_mask, val_mask, test_mask
+
+
 def random_splits_mask_class(
         dataset: InMemoryDataset,
         num_train_per_class: int = 20,
         num_val_per_class: int = 30,
         total_num_val: _typing.Optional[int] = ...,
         total_num_test: _typing.Optional[int] = ...,
-        seed: _typing.Optional[int] = ...
+        seed: _typing.Optional[int] = ...,
+        num_workers: int = 0
 ):
     r"""If the data has masks for train/val/test, return the splits with specific number of samples from every class for training as suggested in Pitfalls of graph neural network evaluation [#]_ for semi-supervised learning.
 
@@ -102,70 +206,50 @@ def random_splits_mask_class(
 
     seed : int
         random seed for splitting dataset.
+
+    num_workers : int
+        number of worker processes to split the graphs in parallel,
+        default to 0 for splitting in the main process.
     """
+    split_targets: _typing.List[_typing.Tuple[int, str, torch.device]] = []
+    split_tasks: _typing.List[_typing.Tuple] = []
+    # without a seed every split starts from the current generator state of the
+    # main process, which worker processes do not share
+    _rng_state: torch.Tensor = torch.get_rng_state()
     for graph_index in range(len(dataset)):
-        for node_type in dataset[graph_index].nodes:
-            if (
-                    'y' in dataset[graph_index].nodes[node_type].data and
-                    'label' in dataset[graph_index].nodes[node_type].data
-            ):
+        graph = dataset[graph_index]
+        for node_type in graph.nodes:
+            node_data = graph.nodes[node_type].data
+            if 'y' in node_data and 'label' in node_data:
                 raise ValueError(
                     f"Both 'y' and 'label' data exist "
                     f"for node type [{node_type}] in "
                     f"graph with index [{graph_index}]."
                 )
-            elif (
-                    'y' not in dataset[graph_index].nodes[node_type].data and
-                    'label' not in dataset[graph_index].nodes[node_type].data
-            ):
+            elif 'y' not in node_data and 'label' not in node_data:
                 continue
-            elif 'y' in dataset[graph_index].nodes[node_type].data:
-                label: torch.Tensor = dataset[graph_index].nodes[node_type].data['y']
-            elif 'label' in dataset[graph_index].nodes[node_type].data:
-                label: torch.Tensor = dataset[graph_index].nodes[node_type].data['label']
+            elif 'y' in node_data:
+                label: torch.Tensor = node_data['y']
+            elif 'label' in node_data:
+                label: torch.Tensor = node_data['label']
             else:
                 raise RuntimeError
-            num_nodes: int = label.size(0)
-            num_classes: int = label.cpu().max().item() + 1
-
-            _rng_state: torch.Tensor = torch.get_rng_state()
-            if seed not in (Ellipsis, None) and isinstance(seed, int):
-                torch.manual_seed(seed)
-            train_mask = torch.zeros(num_nodes, dtype=torch.bool, device=label.device)
-            val_mask = torch.zeros(num_nodes, dtype=torch.bool, device=label.device)
-            test_mask = torch.zeros(num_nodes, dtype=torch.bool, device=label.device)
-            for class_index in range(num_classes):
-                idx = (label == class_index).nonzero().view(-1)
-                assert num_train_per_class + num_val_per_class < idx.size(0), (
-                    f"the total number of samples from every class "
-                    f"used for training and validation is larger than "
-                    f"the total samples in class [{class_index}] for node type [{node_type}] "
-                    f"in graph with index [{graph_index}]"
-                )
-                randomized_index: torch.Tensor = torch.randperm(idx.size(0))
-                train_idx = idx[randomized_index[:num_train_per_class]]
-                val_idx = idx[
-                    randomized_index[num_train_per_class: (num_train_per_class + num_val_per_class)]
-                ]
-                train_mask[train_idx] = True
-                val_mask[val_idx] = True
-
-            if isinstance(total_num_val, int) and total_num_val > 0:
-                remaining = (~train_mask).nonzero().view(-1)
-                remaining = remaining[torch.randperm(remaining.size(0))]
-                val_mask[remaining[:total_num_val]] = True
-                if isinstance(total_num_test, int) and total_num_test > 0:
-                    test_mask[remaining[total_num_val: (total_num_val + total_num_test)]] = True
-                else:
-                    test_mask[remaining[total_num_val:]] = True
-            else:
-                remaining = (~(train_mask + val_mask)).nonzero().view(-1)
-                test_mask[remaining] = True
-
-            torch.set_rng_state(_rng_state)
-            dataset[graph_index].nodes[node_type].data["train_mask"] = train_mask
-            dataset[graph_index].nodes[node_type].data["val_mask"] = val_mask
-            dataset[graph_index].nodes[node_type].data["test_mask"] = test_mask
+            split_targets.append((graph_index, node_type, label.device))
+            split_tasks.append((
+                label.cpu() if num_workers > 0 else label,
+                num_train_per_class, num_val_per_class,
+                total_num_val, total_num_test, seed,
+                f"for node type [{node_type}] in graph with index [{graph_index}]",
+                _rng_state
+            ))
+    for (graph_index, node_type, device), (train_mask, val_mask, test_mask) in zip(
+            split_targets,
+            _map_split_tasks(_random_split_masks_by_class, split_tasks, num_workers)
+    ):
+        node_data = dataset[graph_index].nodes[node_type].data
+        node_data["train_mask"] = train_mask.to(device)
+        node_data["val_mask"] = val_mask.to(device)
+        node_data["test_mask"] = test_mask.to(device)
     return dataset
 
 
@@ -216,16 +300,15 @@ def graph_cross_validation(
         kf = KFold(
             n_splits=n_splits, shuffle=shuffle, random_state=_random_seed
         )
-    dataset_y = [g.data['y' if 'y' in g.data else 'label'].item() for g in dataset]
-    idx_list = [
-        (train_index.tolist(), test_index.tolist())
-        for train_index, test_index
-        in kf.split(np.zeros(len(dataset)), np.array(dataset_y))
-    ]
+    dataset_y: np.ndarray = torch.cat(
+        [g.data['y' if 'y' in g.data else 'label'].view(-1) for g in dataset]
+    ).cpu().numpy()
+    # folds are kept as numpy arrays and only converted once selected
+    idx_list = list(kf.split(np.zeros(len(dataset)), dataset_y))
 
     dataset.folds = idx_list
-    dataset.train_index = idx_list[0][0]
-    dataset.val_index = idx_list[0][1]
+    dataset.train_index = idx_list[0][0].tolist()
+    dataset.val_index = idx_list[0][1].tolist()
     return dataset
 
 
@@ -250,8 +333,8 @@ def set_fold(dataset: InMemoryDataset, fold_id: int) -> InMemoryDataset:
         raise ValueError(
             f"Fold id {fold_id} exceed total cross validation split number {len(dataset.folds)}"
         )
-    dataset.train_index = dataset.folds[fold_id].train_index
-    dataset.val_index = dataset.folds[fold_id].val_index
+    dataset.train_index = np.asarray(dataset.folds[fold_id].train_index).tolist()
+    dataset.val_index = np.asarray(dataset.folds[fold_id].val_index).tolist()
     return dataset
 
 
@@ -295,7 +378,8 @@ def graph_random_splits(
 def graph_get_split(
         dataset, mask: str = "train",
         is_loader: bool = True, batch_size: int = 128,
-        num_workers: int = 0, shuffle: bool = False
+        num_workers: int = 0, shuffle: bool = False,
+        pin_memory: bool = False
 ) -> _typing.Union[torch.utils.data.DataLoader, _typing.Iterable]:
     r"""Get train/test dataset/dataloader after cross validation.
 
@@ -315,6 +399,8 @@ def graph_get_split(
         number of workers parameter for data loader
     shuffle: bool
         whether shuffle the dataloader
+    pin_memory: bool
+        whether the dataloader copies batches into page-locked memory
     """
     if not isinstance(mask, str):
         raise TypeError
@@ -330,6 +416,8 @@ def graph_get_split(
         raise TypeError
     elif not num_workers >= 0:
         raise ValueError
+    if not isinstance(pin_memory, bool):
+        raise TypeError
 
     if mask.lower() not in ("train", "val", "test"):
         raise ValueError
@@ -372,7 +460,7 @@ def graph_get_split(
             return GraphDataLoader(
                 sub_dataset,
                 **{"batch_size": batch_size, "num_workers": num_workers},
-                shuffle=shuffle
+                shuffle=shuffle, pin_memory=pin_memory
             )
         elif _backend.DependentBackend.is_pyg():
             _sub_dataset: _typing.Any = optional_dataset_split
@@ -383,7 +471,8 @@ def graph_get_split(
             else:
                 from torch_geometric.data import DataLoader
             return DataLoader(
-                _sub_dataset, batch_size=batch_size, num_workers=num_workers, shuffle=shuffle
+                _sub_dataset, batch_size=batch_size, num_workers=num_workers, shuffle=shuffle,
+                pin_memory=pin_memory
             )
     else:
         return sub_dataset
@@ -55,6 +55,7 @@ class EarlyStopping:
         delta=0,
         path="checkpoint.pt",
         trace_func=LOGGER_ES.info,
+        snapshot_on_device=False,
     ):
         """
         Args:
@@ -68,6 +69,10 @@ class EarlyStopping:
                             Default: 'checkpoint.pt'
             trace_func (function): trace print function.
                             Default: print
+            snapshot_on_device (bool): If True, keep the best parameters on the model's device
+                            while training instead of serializing them to the host on every
+                            improvement, at the cost of a second copy of the weights on the device.
+                            Default: False
         """
         self.patience = 100 if patience is None else patience
         self.verbose = verbose
@@ -78,6 +83,7 @@ class EarlyStopping:
         self.delta = delta
         self.path = path
         self.trace_func = trace_func
+        self.snapshot_on_device = snapshot_on_device
 
     def __call__(self, val_loss, model):
         score = -val_loss
@@ -104,13 +110,25 @@ class EarlyStopping:
             self.trace_func(
                 f"Validation loss decreased ({self.val_loss_min:.6f} --> {val_loss:.6f}).  Saving model ..."
             )
-        self.best_param = pickle.dumps(model.state_dict())
+        if self.snapshot_on_device:
+            # load_checkpoint offloads the snapshot once training is over
+            self.best_param = {
+                key: value.detach().clone() for key, value in model.state_dict().items()
+            }
+        else:
+            self.best_param = pickle.dumps(model.state_dict())
         # torch.save(model.state_dict(), self.path)
         self.val_loss_min = val_loss
 
     def load_checkpoint(self, model):
         """Load models"""
-        if hasattr(self, "best_param"):
+        if hasattr(self, "best_param") and isinstance(self.best_param, dict):
+            model.load_state_dict(self.best_param)
+            # training is over, do not hold a second copy of the weights on the device
+            self.best_param = {
+                key: value.cpu() for key, value in self.best_param.items()
+            }
+        elif hasattr(self, "best_param"):
             model.load_state_dict(pickle.loads(self.best_param))
         else:
             LOGGER_ES.warn("try to load checkpoint while no checkpoint is saved")
@@ -12,7 +12,10 @@ from ..model import BaseAutoModel, BaseDecoderMaintainer, BaseEncoderMaintainer
 from .evaluation import get_feval, Logloss
 from typing import Tuple, Type, Union
 from ...datasets import utils
-from copy import deepcopy
+from ...data import InMemoryDataset
+from copy import copy, deepcopy
+from contextlib import nullcontext
+from functools import partial
 import torch.multiprocessing as mp
 
 from ...utils import get_logger
@@ -22,6 +25,50 @@ from ...backend import DependentBackend
 LOGGER = get_logger("graph classification solver")
 
 
+class _CUDAPrefetcher:
+    """
+    Iterate over a loader while copying the next batch to the device on a
+    side CUDA stream, so that the host-to-device transfer of batch ``i + 1``
+    overlaps with the forward/backward of batch ``i``.
+    Batches are passed through ``transfer`` unchanged on non-CUDA devices.
+    """
+
+    def __init__(self, loader, transfer, device: torch.device):
+        self.loader = loader
+        self.transfer = transfer
+        self.device = device
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __iter__(self):
+        if self.device.type != "cuda":
+            for batch in self.loader:
+                yield self.transfer(batch)
+            return
+
+        stream = torch.cuda.Stream(device=self.device)
+        iterator = iter(self.loader)
+
+        def _preload():
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                return None
+            # the side stream must not overwrite memory released by batches
+            # the main stream may still be consuming
+            stream.wait_stream(torch.cuda.current_stream(self.device))
+            with torch.cuda.stream(stream):
+                return self.transfer(batch)
+
+        next_batch = _preload()
+        while next_batch is not None:
+            torch.cuda.current_stream(self.device).wait_stream(stream)
+            batch = next_batch
+            next_batch = _preload()
+            yield batch
+
+
 @register_trainer("GraphClassificationFull")
 class GraphClassificationFullTrainer(BaseGraphClassificationTrainer):
     """
@@ -78,6 +125,15 @@ class GraphClassificationFullTrainer(BaseGraphClassificationTrainer):
     lr_scheduler_type: ``str`` (Optional)
         The lr scheduler type used. Default None.
 
+    autocast: ``bool``
+        If True, run the training forward and loss under bfloat16 autocast when
+        the device is cuda, requires ``torch>=1.10``. Default False.
+
+    device_resident: ``bool``
+        If True, move each dataset split to the device once and collate the batches
+        there, instead of copying every batch from the host. Only suitable for
+        datasets that fit in device memory. Default False.
+
     """
 
     space = None
@@ -101,6 +157,8 @@ class GraphClassificationFullTrainer(BaseGraphClassificationTrainer):
         loss="nll_loss",
         lr_scheduler_type=None,
         criterion=None,
+        autocast: bool = False,
+        device_resident: bool = False,
         *args,
         **kwargs
     ):
@@ -134,6 +192,8 @@ class GraphClassificationFullTrainer(BaseGraphClassificationTrainer):
             raise ValueError("Currently not support optimizer {}".format(optimizer))
 
         self.lr_scheduler_type = lr_scheduler_type
+        self.autocast = autocast
+        self.device_resident = device_resident
 
         self.lr = lr
         self.max_epoch = max_epoch
@@ -153,7 +213,7 @@ class GraphClassificationFullTrainer(BaseGraphClassificationTrainer):
         self.weight_decay = weight_decay
 
         self.early_stopping = EarlyStopping(
-            patience=early_stopping_round, verbose=False
+            patience=early_stopping_round, verbose=False, snapshot_on_device=True
         )
 
         self.valid_result = None
@@ -216,6 +276,36 @@ class GraphClassificationFullTrainer(BaseGraphClassificationTrainer):
     def get_task_name(cls):
         return "GraphClassification"
 
+    def _to_device(self, data):
+        if self.pyg_dgl == 'dgl':
+            return [item.to(self.device, non_blocking=True) for item in data]
+        return data.to(self.device, non_blocking=True)
+
+    def _on_host(self, data) -> bool:
+        if self.pyg_dgl == 'dgl':
+            items = data if isinstance(data, (tuple, list)) else [data]
+        else:
+            items = [item for _, item in data if isinstance(item, torch.Tensor)]
+        return all(item.device.type == "cpu" for item in items)
+
+    def _get_loader(self, dataset, mask, shuffle=False):
+        split = utils.graph_get_split(dataset, mask, is_loader=False)
+        if not self.device_resident:
+            # only host memory can be pinned, the dgl collator pins the labels but not the graphs
+            pin_memory = self.device.type == "cuda" and len(split) > 0 and self._on_host(split[0])
+            return utils.graph_get_split(
+                dataset, mask, batch_size=self.batch_size, num_workers=self.num_workers,
+                pin_memory=pin_memory, shuffle=shuffle
+            )
+        if self.pyg_dgl == 'dgl':
+            resident = [tuple(self._to_device(data)) for data in split]
+        else:
+            # pyg moves a Data in place, move a shallow copy to leave the caller's graphs on the host
+            resident = [self._to_device(copy(data)) for data in split]
+        split = InMemoryDataset(resident, **{f"{mask.lower()}_index": list(range(len(resident)))})
+        # the split already lives on the device, worker processes and pinning do not apply
+        return utils.graph_get_split(split, mask, batch_size=self.batch_size, shuffle=shuffle)
+
     def _train_only(self, train_loader, valid_loader=None):
         model = self._compose_model()
 
@@ -237,38 +327,41 @@ class GraphClassificationFullTrainer(BaseGraphClassificationTrainer):
         else:
             scheduler = None
 
+        # bfloat16 keeps the fp32 exponent range, so no grad scaler is needed
+        if self.autocast and self.device.type == "cuda":
+            autocast = partial(torch.autocast, device_type="cuda", dtype=torch.bfloat16)
+        else:
+            autocast = nullcontext
+
         for epoch in range(1, self.max_epoch + 1):
             model.train()
-            loss_all = 0
-            for data in train_loader:
+            for data in _CUDAPrefetcher(train_loader, self._to_device, self.device):
                 if self.pyg_dgl == 'pyg':
-                    data = data.to(self.device)
                     optimizer.zero_grad()
-                    output = model(data)
-                    
-                    if hasattr(F, self.loss):
-                        loss = getattr(F, self.loss)(output, data.y)
-                    else:
-                        raise TypeError(
-                            "PyTorch does not support loss type {}".format(self.loss)
-                        )
+                    with autocast():
+                        output = model(data)
+
+                        if hasattr(F, self.loss):
+                            loss = getattr(F, self.loss)(output, data.y)
+                        else:
+                            raise TypeError(
+                                "PyTorch does not support loss type {}".format(self.loss)
+                            )
                     loss.backward()
-                    loss_all += data.num_graphs * loss.item()
                 elif self.pyg_dgl == 'dgl':
-                    data = [data[i].to(self.device) for i in range(len(data))]
                     data, labels = data
                     optimizer.zero_grad()
-                    output = model(data)
+                    with autocast():
+                        output = model(data)
 
-                    if hasattr(F, self.loss):
-                        loss = getattr(F, self.loss)(output, labels)
-                    else:
-                        raise TypeError(
-                            "PyTorch does not support loss type {}".format(self.loss)
-                        )
+                        if hasattr(F, self.loss):
+                            loss = getattr(F, self.loss)(output, labels)
+                        else:
+                            raise TypeError(
+                                "PyTorch does not support loss type {}".format(self.loss)
+                            )
 
                     loss.backward()
-                    loss_all += len(labels) * loss.item()
 
                 optimizer.step()
                 if self.lr_scheduler_type:
@@ -296,14 +389,12 @@ class GraphClassificationFullTrainer(BaseGraphClassificationTrainer):
         model.eval()
         pred = []
         label = []
-        for data in loader:
+        for data in _CUDAPrefetcher(loader, self._to_device, self.device):
             if self.pyg_dgl == 'pyg':
-                data = data.to(self.device)
                 out = model(data)
                 pred.append(out)
                 label.append(data.y)
             elif self.pyg_dgl == 'dgl':
-                data = [data[i].to(self.device) for i in range(len(data))]
                 data, labels = data
                 out = model(data)
                 pred.append(out)
@@ -333,18 +424,15 @@ class GraphClassificationFullTrainer(BaseGraphClassificationTrainer):
             A reference of current trainer.
 
         """
-        train_loader = utils.graph_get_split(
-            dataset, "train", batch_size=self.batch_size, num_workers=self.num_workers, shuffle=True
-        )
-        valid_loader = utils.graph_get_split(
-            dataset, "val", batch_size=self.batch_size, num_workers=self.num_workers
-        )
+        train_loader = self._get_loader(dataset, "train", shuffle=True)
+        # the validation batches are identical every epoch, collate them only once
+        valid_loader = list(self._get_loader(dataset, "val"))
         self._train_only(train_loader, valid_loader)
         if keep_valid_result and valid_loader:
             pred = self._predict_only(valid_loader)
             self.valid_result = pred.max(1)[1]
             self.valid_result_prob = pred
-            self.valid_score = self.evaluate(dataset, mask="val", feval=self.feval)
+            self.valid_score = self._evaluate(valid_loader, self.feval)
 
     def predict(self, dataset, mask="test"):
         """
@@ -362,9 +450,7 @@ class GraphClassificationFullTrainer(BaseGraphClassificationTrainer):
         The prediction result of ``predict_proba``.
         """
 
-        loader = utils.graph_get_split(
-            dataset, mask, batch_size=self.batch_size, num_workers=self.num_workers
-        )
+        loader = self._get_loader(dataset, mask)
         return self._predict_proba(loader, in_log_format=True).max(1)[1]
 
     def predict_proba(self, dataset, mask="test", in_log_format=False):
@@ -385,9 +471,7 @@ class GraphClassificationFullTrainer(BaseGraphClassificationTrainer):
         -------
         The prediction result.
         """
-        loader = utils.graph_get_split(
-            dataset, mask, batch_size=self.batch_size, num_workers=self.num_workers
-        )
+        loader = self._get_loader(dataset, mask)
         return self._predict_proba(loader, in_log_format)
 
     def _predict_proba(self, loader, in_log_format=False, return_label=False):
@@ -471,9 +555,7 @@ class GraphClassificationFullTrainer(BaseGraphClassificationTrainer):
 
         """
 
-        loader = utils.graph_get_split(
-            dataset, mask, batch_size=self.batch_size, num_workers=self.num_workers
-        )
+        loader = self._get_loader(dataset, mask)
         return self._evaluate(loader, feval)
 
 
@@ -592,6 +674,8 @@ class GraphClassificationFullTrainer(BaseGraphClassificationTrainer):
             feval=self.feval,
             loss=self.loss,
             lr_scheduler_type=self.lr_scheduler_type,
+            autocast=self.autocast,
+            device_resident=self.device_resident,
             init=True,
             *self.args,
             **self.kwargs
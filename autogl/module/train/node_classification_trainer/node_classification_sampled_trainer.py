@@ -849,6 +849,7 @@ class NodeClassificationLayerDependentImportanceSamplingTrainer(
                 self.__sampled_node_sizes,
                 batch_size=self.__training_batch_size,
                 num_workers=self.__training_sampler_num_workers,
+                pin_memory=self.device.type == "cuda",
             )
         )
         for current_epoch in range(self._max_epoch):
@@ -860,17 +861,23 @@ class NodeClassificationLayerDependentImportanceSamplingTrainer(
                 optimizer.zero_grad()
                 sampled_data: TargetDependantSampledData = sampled_data
                 # 由于现在的Model设计是接受Data的，所以只能组装一个采样的Data作为参数
+                sampled_x: torch.Tensor = integral_data.x[sampled_data.all_sampled_nodes_indexes]
+                sampled_y: torch.Tensor = integral_data.y[sampled_data.all_sampled_nodes_indexes]
+                if self.device.type == "cuda" and sampled_x.device.type == "cpu":
+                    # the gathered features are the largest transfer of every batch
+                    sampled_x, sampled_y = sampled_x.pin_memory(), sampled_y.pin_memory()
                 sampled_graph: autogl.data.Data = autogl.data.Data(
-                    x=integral_data.x[sampled_data.all_sampled_nodes_indexes],
-                    y=integral_data.y[sampled_data.all_sampled_nodes_indexes],
+                    x=sampled_x.to(self.device, non_blocking=True),
+                    y=sampled_y.to(self.device, non_blocking=True),
                 )
-                sampled_graph.to(self.device)
                 sampled_graph.edge_indexes: _typing.Sequence[torch.LongTensor] = [
-                    current_layer.edge_index_for_sampled_graph.to(self.device)
+                    current_layer.edge_index_for_sampled_graph.to(
+                        self.device, non_blocking=True
+                    )
                     for current_layer in sampled_data.sampled_edges_for_layers
                 ]
                 sampled_graph.edge_weights: _typing.Sequence[torch.Tensor] = [
-                    current_layer.edge_weight.to(self.device)
+                    current_layer.edge_weight.to(self.device, non_blocking=True)
                     for current_layer in sampled_data.sampled_edges_for_layers
                 ]
                 if isinstance(self.model.model, ClassificationSupportedSequentialModel):
@@ -7,6 +7,23 @@ import torch_geometric
 from . import target_dependant_sampler
 
 
+def _normalize_edge_weight_by_target_nodes(
+    target_nodes_indexes: torch.Tensor, edge_weight: torch.Tensor
+) -> torch.Tensor:
+    """
+    :param target_nodes_indexes: target node index of every edge
+    :param edge_weight: weight of every edge
+    :return: edge weight normalized to sum to 1 for every target node
+    """
+    if target_nodes_indexes.numel() != edge_weight.numel():
+        raise ValueError
+    _target_nodes, _inverse_indexes = target_nodes_indexes.unique(return_inverse=True)
+    _sum_weight_by_target_nodes: torch.Tensor = torch.zeros(
+        _target_nodes.numel(), dtype=edge_weight.dtype, device=edge_weight.device
+    ).scatter_add_(0, _inverse_indexes, edge_weight)
+    return edge_weight / _sum_weight_by_target_nodes[_inverse_indexes]
+
+
 class _LayerDependentImportanceSampler(
     target_dependant_sampler.BasicLayerWiseTargetDependantSampler
 ):
@@ -17,24 +34,23 @@ class _LayerDependentImportanceSampler(
     class _Utility:
         @classmethod
         def compute_edge_weights(
-            cls, __all_edge_index_with_self_loops: torch.Tensor
+            cls, __all_edge_index_with_self_loops: torch.Tensor, num_nodes: int
         ) -> torch.Tensor:
             __out_degree: torch.Tensor = torch_geometric.utils.degree(
-                __all_edge_index_with_self_loops[0]
+                __all_edge_index_with_self_loops[0], num_nodes
             )
             __in_degree: torch.Tensor = torch_geometric.utils.degree(
-                __all_edge_index_with_self_loops[1]
+                __all_edge_index_with_self_loops[1], num_nodes
             )
 
-            temp_tensor: torch.Tensor = torch.stack(
-                [
-                    __out_degree[__all_edge_index_with_self_loops[0]],
-                    __in_degree[__all_edge_index_with_self_loops[1]],
-                ]
+            __out_degree: torch.Tensor = torch.pow(__out_degree, -0.5)
+            __out_degree[torch.isinf(__out_degree)] = 0.0
+            __in_degree: torch.Tensor = torch.pow(__in_degree, -0.5)
+            __in_degree[torch.isinf(__in_degree)] = 0.0
+            return (
+                __out_degree[__all_edge_index_with_self_loops[0]]
+                * __in_degree[__all_edge_index_with_self_loops[1]]
             )
-            temp_tensor: torch.Tensor = torch.pow(temp_tensor, -0.5)
-            temp_tensor[torch.isinf(temp_tensor)] = 0.0
-            return temp_tensor[0] * temp_tensor[1]
 
         @classmethod
         def get_candidate_source_nodes_probabilities(
@@ -49,28 +65,22 @@ class _LayerDependentImportanceSampler(
             :param all_edge_weights:
             :return: (all_source_nodes_indexes, all_source_nodes_probabilities)
             """
-            all_candidate_edge_indexes: torch.LongTensor = (
-                all_candidate_edge_indexes.unique()
-            )
             _all_candidate_edges_weights: torch.Tensor = all_edge_weights[
                 all_candidate_edge_indexes
             ]
-            all_candidate_source_nodes_indexes: torch.LongTensor = (
-                all_edge_index_with_self_loops[0, all_candidate_edge_indexes].unique()
+            (
+                all_candidate_source_nodes_indexes,
+                _inverse_indexes,
+            ) = all_edge_index_with_self_loops[0, all_candidate_edge_indexes].unique(
+                return_inverse=True
             )
-            all_candidate_source_nodes_probabilities: torch.Tensor = torch.tensor(
-                [
-                    torch.sum(
-                        _all_candidate_edges_weights[
-                            all_edge_index_with_self_loops[
-                                0, all_candidate_edge_indexes
-                            ]
-                            == _current_source_node_index
-                        ]
-                    ).item()
-                    / torch.sum(_all_candidate_edges_weights).item()
-                    for _current_source_node_index in all_candidate_source_nodes_indexes.tolist()
-                ]
+            _aggregated_weights: torch.Tensor = torch.zeros(
+                all_candidate_source_nodes_indexes.numel(),
+                dtype=_all_candidate_edges_weights.dtype,
+                device=_all_candidate_edges_weights.device,
+            ).scatter_add_(0, _inverse_indexes, _all_candidate_edges_weights)
+            all_candidate_source_nodes_probabilities: torch.Tensor = (
+                _aggregated_weights / torch.sum(_aggregated_weights)
             )
             assert (
                 all_candidate_source_nodes_indexes.size()
@@ -81,51 +91,70 @@ class _LayerDependentImportanceSampler(
                 all_candidate_source_nodes_probabilities,
             )
 
+        @classmethod
+        def sort_edges_by_target_nodes(
+            cls, all_edges_with_self_loops: torch.Tensor, num_nodes: int
+        ) -> _typing.Tuple[torch.LongTensor, torch.LongTensor]:
+            """
+            :param all_edges_with_self_loops: all edges with self loops
+            :param num_nodes: number of nodes in the integral graph
+            :return: (edge indexes sorted by target nodes, CSR index pointer of target nodes)
+            """
+            sorted_target_nodes_indexes, edge_indexes_sorted_by_target_nodes = torch.sort(
+                all_edges_with_self_loops[1]
+            )
+            target_nodes_index_pointer: torch.LongTensor = torch.searchsorted(
+                sorted_target_nodes_indexes,
+                torch.arange(num_nodes + 1, device=all_edges_with_self_loops.device),
+            )
+            return edge_indexes_sorted_by_target_nodes, target_nodes_index_pointer
+
+        @classmethod
+        def get_edges_by_target_nodes(
+            cls,
+            edge_indexes_sorted_by_target_nodes: torch.LongTensor,
+            target_nodes_index_pointer: torch.LongTensor,
+            target_nodes_indexes: torch.LongTensor,
+        ) -> torch.LongTensor:
+            """
+            :param edge_indexes_sorted_by_target_nodes: edge indexes sorted by target nodes
+            :param target_nodes_index_pointer: CSR index pointer of target nodes
+            :param target_nodes_indexes: unique target node indexes
+            :return: sorted indexes of edges pointing to the target nodes
+            """
+            _start: torch.LongTensor = target_nodes_index_pointer[target_nodes_indexes]
+            _count: torch.LongTensor = (
+                target_nodes_index_pointer[target_nodes_indexes + 1] - _start
+            )
+            _positions: torch.LongTensor = torch.arange(
+                int(_count.sum()), device=_start.device
+            ) + torch.repeat_interleave(_start - (torch.cumsum(_count, 0) - _count), _count)
+            return edge_indexes_sorted_by_target_nodes[_positions].sort()[0]
+
         @classmethod
         def filter_selected_edges_by_source_nodes_and_target_nodes(
             cls,
             all_edges_with_self_loops: torch.Tensor,
             selected_source_node_indexes: torch.LongTensor,
-            selected_target_node_indexes: torch.LongTensor,
+            candidate_edge_indexes_for_target_nodes: torch.LongTensor,
+            num_nodes: int,
         ) -> torch.Tensor:
             """
             :param all_edges_with_self_loops: all edges with self loops
             :param selected_source_node_indexes: selected source node indexes
-            :param selected_target_node_indexes: selected target node indexes
+            :param candidate_edge_indexes_for_target_nodes: indexes of edges pointing to selected target nodes
+            :param num_nodes: number of nodes in the integral graph
             :return: filtered edge indexes
             """
-            selected_edges_mask_for_source_nodes: torch.Tensor = torch.zeros(
-                all_edges_with_self_loops.size(1), dtype=torch.bool
-            )
-            selected_edges_mask_for_source_nodes[
-                torch.cat(
-                    [
-                        torch.where(
-                            all_edges_with_self_loops[0]
-                            == __current_selected_source_node_index
-                        )[0]
-                        for __current_selected_source_node_index in selected_source_node_indexes.unique().tolist()
-                    ]
-                ).unique()
-            ] = True
-            selected_edges_mask_for_target_nodes: torch.Tensor = torch.zeros(
-                all_edges_with_self_loops.size(1), dtype=torch.bool
+            selected_source_nodes_mask: torch.Tensor = torch.zeros(
+                num_nodes, dtype=torch.bool, device=all_edges_with_self_loops.device
             )
-            selected_edges_mask_for_target_nodes[
-                torch.cat(
-                    [
-                        torch.where(
-                            all_edges_with_self_loops[1]
-                            == __current_selected_target_node_index
-                        )[0]
-                        for __current_selected_target_node_index in selected_target_node_indexes.unique().tolist()
-                    ]
-                )
-            ] = True
-            return torch.where(
-                selected_edges_mask_for_source_nodes
-                & selected_edges_mask_for_target_nodes
-            )[0]
+            selected_source_nodes_mask[selected_source_node_indexes] = True
+            return candidate_edge_indexes_for_target_nodes[
+                selected_source_nodes_mask[
+                    all_edges_with_self_loops[0, candidate_edge_indexes_for_target_nodes]
+                ]
+            ]
 
     def __init__(
         self,
@@ -146,9 +175,14 @@ class _LayerDependentImportanceSampler(
             shuffle,
             **kwargs
         )
+        self.__num_nodes: int = int(self._edge_index.max()) + 1
         self.__all_edge_weights: torch.Tensor = self._Utility.compute_edge_weights(
-            self._edge_index
+            self._edge_index, self.__num_nodes
         )
+        (
+            self.__edge_indexes_sorted_by_target_nodes,
+            self.__target_nodes_index_pointer,
+        ) = self._Utility.sort_edges_by_target_nodes(self._edge_index, self.__num_nodes)
 
     def _sample_edges_for_layer(
         self,
@@ -174,12 +208,13 @@ class _LayerDependentImportanceSampler(
         else:
             sampled_node_size_budget: int = layer_argument
 
-        all_candidate_edge_indexes: torch.LongTensor = torch.cat(
-            [
-                torch.where(self._edge_index[1] == current_target_node_index)[0]
-                for current_target_node_index in __current_layer_target_nodes_indexes.unique().tolist()
-            ]
-        ).unique()
+        all_candidate_edge_indexes: torch.LongTensor = (
+            self._Utility.get_edges_by_target_nodes(
+                self.__edge_indexes_sorted_by_target_nodes,
+                self.__target_nodes_index_pointer,
+                __current_layer_target_nodes_indexes,
+            )
+        )
         (
             __all_candidate_source_nodes_indexes,
             all_candidate_source_nodes_probabilities,
@@ -197,17 +232,12 @@ class _LayerDependentImportanceSampler(
         if sampled_node_size_budget < __all_candidate_source_nodes_indexes.numel():
             selected_source_node_indexes: torch.LongTensor = (
                 __all_candidate_source_nodes_indexes[
-                    torch.from_numpy(
-                        np.unique(
-                            np.random.choice(
-                                np.arange(__all_candidate_source_nodes_indexes.numel()),
-                                sampled_node_size_budget,
-                                p=all_candidate_source_nodes_probabilities.numpy(),
-                                replace=False,
-                            )
-                        )
-                    ).unique()
-                ].unique()
+                    torch.multinomial(
+                        all_candidate_source_nodes_probabilities,
+                        sampled_node_size_budget,
+                        replacement=False,
+                    )
+                ]
             )
         else:
             selected_source_node_indexes: torch.LongTensor = (
@@ -215,46 +245,29 @@ class _LayerDependentImportanceSampler(
             )
         selected_source_node_indexes: torch.LongTensor = torch.cat(
             [selected_source_node_indexes, __top_layer_target_nodes_indexes]
-        ).unique()
+        )
 
         __selected_edges_indexes: torch.LongTensor = (
             self._Utility.filter_selected_edges_by_source_nodes_and_target_nodes(
                 self._edge_index,
                 selected_source_node_indexes,
-                __current_layer_target_nodes_indexes,
-            ).unique()
+                all_candidate_edge_indexes,
+                self.__num_nodes,
+            )
         )
 
         non_normalized_selected_edges_weight: torch.Tensor = self.__all_edge_weights[
             __selected_edges_indexes
-        ] / torch.tensor(
-            [
-                all_candidate_source_nodes_probabilities[
-                    __all_candidate_source_nodes_indexes == current_source_node_index
-                ].item()
-                for current_source_node_index in self._edge_index[
-                    0, __selected_edges_indexes
-                ].tolist()
-            ]
-        )
-
-        def __normalize_edges_weight_by_target_nodes(
-            __edge_index: torch.Tensor, __edge_weight: torch.Tensor
-        ) -> torch.Tensor:
-            if __edge_index.size(1) != __edge_weight.numel():
-                raise ValueError
-            for current_target_node_index in __edge_index[1].unique().tolist():
-                __current_mask_for_edges: torch.BoolTensor = (
-                    __edge_index[1] == current_target_node_index
-                )
-                __edge_weight[__current_mask_for_edges] = __edge_weight[
-                    __current_mask_for_edges
-                ] / torch.sum(__edge_weight[__current_mask_for_edges])
-            return __edge_weight
+        ] / all_candidate_source_nodes_probabilities[
+            torch.searchsorted(
+                __all_candidate_source_nodes_indexes,
+                self._edge_index[0, __selected_edges_indexes],
+            )
+        ]
 
         normalized_selected_edges_weight: torch.Tensor = (
-            __normalize_edges_weight_by_target_nodes(
-                self._edge_index[:, __selected_edges_indexes],
+            _normalize_edge_weight_by_target_nodes(
+                self._edge_index[1, __selected_edges_indexes],
                 non_normalized_selected_edges_weight,
             )
         )
@@ -298,16 +311,16 @@ class LayerDependentImportanceSampler(
 
     @classmethod
     def __compute_edge_weight(cls, edge_index: torch.Tensor) -> torch.Tensor:
-        __num_nodes: int = max(int(edge_index[0].max()), int(edge_index[1].max())) + 1
-        _temp_tensor: torch.Tensor = torch.stack(
-            [
-                torch_geometric.utils.degree(edge_index[0], __num_nodes)[edge_index[0]],
-                torch_geometric.utils.degree(edge_index[1], __num_nodes)[edge_index[1]],
-            ]
+        __num_nodes: int = int(edge_index.max()) + 1
+        _out_degree: torch.Tensor = torch.pow(
+            torch_geometric.utils.degree(edge_index[0], __num_nodes), -0.5
         )
-        _temp_tensor: torch.Tensor = torch.pow(_temp_tensor, -0.5)
-        _temp_tensor[torch.isinf(_temp_tensor)] = 0
-        return _temp_tensor[0] * _temp_tensor[1]
+        _out_degree[torch.isinf(_out_degree)] = 0
+        _in_degree: torch.Tensor = torch.pow(
+            torch_geometric.utils.degree(edge_index[1], __num_nodes), -0.5
+        )
+        _in_degree[torch.isinf(_in_degree)] = 0
+        return _out_degree[edge_index[0]] * _in_degree[edge_index[1]]
 
     def __init__(
         self,
@@ -329,9 +342,9 @@ class LayerDependentImportanceSampler(
             **kwargs
         )
         self.__edge_weight: torch.Tensor = self.__compute_edge_weight(self._edge_index)
-        self.__integral_normalized_l_matrix: sp.csr_matrix = sp.csr_matrix(
+        self.__integral_squared_normalized_l_matrix: sp.csr_matrix = sp.csr_matrix(
             (
-                self.__edge_weight.numpy(),
+                np.square(self.__edge_weight.numpy()),
                 (self._edge_index[1].numpy(), self._edge_index[0].numpy()),
             )
         )
@@ -359,12 +372,16 @@ class LayerDependentImportanceSampler(
                     corresponding probabilities for sampled_source_nodes_indexes
         )
         """
-        partial_l_matrix: sp.csr_matrix = self.__integral_normalized_l_matrix[
-            __current_layer_target_nodes_indexes, :
-        ]
-        p: np.ndarray = np.array(
-            np.sum(partial_l_matrix.multiply(partial_l_matrix), axis=0)
-        )[0]
+        partial_squared_l_matrix: sp.csr_matrix = (
+            self.__integral_squared_normalized_l_matrix[
+                __current_layer_target_nodes_indexes, :
+            ]
+        )
+        p: np.ndarray = np.bincount(
+            partial_squared_l_matrix.indices,
+            weights=partial_squared_l_matrix.data,
+            minlength=partial_squared_l_matrix.shape[1],
+        )
         p: np.ndarray = p / np.sum(p)
         _number_of_nodes_to_sample = np.min(
             [np.sum(p > 0), sampled_source_nodes_budget]
@@ -385,11 +402,13 @@ class LayerDependentImportanceSampler(
                 __current_layer_target_nodes_indexes, :
             ]
         )
-        _sampled_edges_indexes_sparse_matrix: sp.csc_matrix = (
-            _sampled_edges_indexes_sparse_matrix.tocsc()[:, _selected_source_nodes]
-        )
         _sampled_edges_indexes: np.ndarray = np.unique(
-            _sampled_edges_indexes_sparse_matrix.data
+            _sampled_edges_indexes_sparse_matrix.data[
+                np.isin(
+                    _sampled_edges_indexes_sparse_matrix.indices,
+                    _selected_source_nodes,
+                )
+            ]
         )
 
         return _sampled_edges_indexes, _selected_source_nodes, p[_selected_source_nodes]
@@ -439,39 +458,22 @@ class LayerDependentImportanceSampler(
         )
 
         """ Multiply corresponding discount weights """
-        __selected_source_node_probability_mapping: _typing.Dict[int, float] = dict(
-            zip(
-                _selected_source_nodes.tolist(),
-                _selected_source_nodes_probabilities.tolist(),
-            )
-        )
         _selected_edges_weight: torch.Tensor = self.__edge_weight[
             _sampled_edges_indexes
         ]
-        _selected_edges_weight: torch.Tensor = _selected_edges_weight / torch.tensor(
-            [
-                __selected_source_node_probability_mapping.get(
-                    _current_source_node_index
+        _selected_edges_weight: torch.Tensor = (
+            _selected_edges_weight
+            / _selected_source_nodes_probabilities[
+                torch.searchsorted(
+                    _selected_source_nodes, self._edge_index[0, _sampled_edges_indexes]
                 )
-                for _current_source_node_index in self._edge_index[
-                    0, _sampled_edges_indexes
-                ].tolist()
-            ]
+            ].to(_selected_edges_weight.dtype)
         )
 
         """ Normalize edge weight for selected edges by target nodes """
-        for _current_target_node_index in (
-            self._edge_index[1, _sampled_edges_indexes].unique().tolist()
-        ):
-            _current_mask_for_selected_edges: torch.BoolTensor = (
-                self._edge_index[1, _sampled_edges_indexes]
-                == _current_target_node_index
-            )
-            _selected_edges_weight[
-                _current_mask_for_selected_edges
-            ] = _selected_edges_weight[_current_mask_for_selected_edges] / torch.sum(
-                _selected_edges_weight[_current_mask_for_selected_edges]
-            )
+        _selected_edges_weight: torch.Tensor = _normalize_edge_weight_by_target_nodes(
+            self._edge_index[1, _sampled_edges_indexes], _selected_edges_weight
+        )
 
         _sampled_edges_indexes: _typing.Union[
             torch.LongTensor, torch.Tensor
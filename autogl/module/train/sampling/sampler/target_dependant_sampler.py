@@ -68,6 +68,14 @@ class TargetDependantSampledData:
         def edge_weight(self) -> _typing.Optional[torch.Tensor]:
             return self.__edge_weight
 
+        def pin_memory(self):
+            self.__edge_index_for_sampled_graph = (
+                self.__edge_index_for_sampled_graph.pin_memory()
+            )
+            if self.__edge_weight is not None:
+                self.__edge_weight = self.__edge_weight.pin_memory()
+            return self
+
     class _TargetNodes:
         @property
         def indexes_in_sampled_graph(self) -> torch.LongTensor:
@@ -121,6 +129,17 @@ class TargetDependantSampledData:
         )
         self.__all_sampled_nodes_indexes: torch.Tensor = all_sampled_nodes_indexes
 
+    def pin_memory(self) -> "TargetDependantSampledData":
+        """
+        Copy the sampled edges and edge weights into page-locked memory,
+        invoked by :class:`torch.utils.data.DataLoader` when `pin_memory` is enabled,
+        such that the successive host-to-device transfers can be asynchronous.
+        The remaining indexes are only used on the host and stay pageable.
+        """
+        for layer_sampled_edge_data in self.__sampled_edges_for_layers:
+            layer_sampled_edge_data.pin_memory()
+        return self
+
 
 class TargetDependantSampler(torch.utils.data.DataLoader, _typing.Iterable):
     """
@@ -264,9 +264,9 @@ def set_seed(seed=None):
 
     random.seed(seed)
     np.random.seed(seed)
+    # also seeds the generators of every cuda device
     torch.manual_seed(seed)
     if torch.cuda.is_available():
-        torch.cuda.manual_seed_all(seed)
         torch.backends.cudnn.deterministic = True
         torch.backends.cudnn.benchmark = False
 
@@ -0,0 +1,71 @@
+# test the random node splits
+
+import torch
+from autogl.data import InMemoryDataset
+from autogl.data.graph import GeneralStaticGraphGenerator
+from autogl.datasets import utils
+
+
+def build_graph(label):
+    num_nodes = label.size(0)
+    return GeneralStaticGraphGenerator.create_homogeneous_static_graph(
+        {'x': torch.ones(num_nodes, 4), 'y': label},
+        torch.stack([torch.arange(num_nodes - 1), torch.arange(1, num_nodes)])
+    )
+
+def test_random_splits_mask_class():
+    # 3 classes of 10 nodes and 4 unlabeled nodes, interleaved
+    label = torch.cat([torch.arange(3).repeat(10), torch.full((4,), -1)])
+    label = label[torch.randperm(label.size(0))]
+    dataset = InMemoryDataset([build_graph(label)])
+    utils.random_splits_mask_class(dataset, num_train_per_class=2, num_val_per_class=3, seed=0)
+
+    node_data = dataset[0].nodes.data
+    train_mask, val_mask, test_mask = node_data['train_mask'], node_data['val_mask'], node_data['test_mask']
+    # disjoint and covering every node
+    assert torch.equal(train_mask.long() + val_mask.long() + test_mask.long(), torch.ones_like(label))
+    for c in range(3):
+        assert int((train_mask & (label == c)).sum()) == 2
+        assert int((val_mask & (label == c)).sum()) == 3
+    # unlabeled nodes are never used for training or validation
+    assert not bool(((train_mask | val_mask) & (label < 0)).any())
+
+    # class 2 only has as many nodes as needed for training and validation
+    label = torch.cat([torch.arange(2).repeat(10), torch.full((5,), 2)])
+    try:
+        utils.random_splits_mask_class(
+            InMemoryDataset([build_graph(label)]), num_train_per_class=2, num_val_per_class=3, seed=0
+        )
+    except AssertionError:
+        pass
+    else:
+        raise AssertionError("insufficient class is not detected")
+
+def test_random_splits_num_workers():
+    labels = [torch.arange(n) % 3 for n in (40, 50, 60)]
+
+    def masks(function, num_workers, **kwargs):
+        dataset = InMemoryDataset([build_graph(label) for label in labels])
+        rng_state = torch.get_rng_state()
+        function(dataset, num_workers=num_workers, **kwargs)
+        # splitting must not consume the random state of the caller
+        assert torch.equal(torch.get_rng_state(), rng_state)
+        return [
+            [graph.nodes.data[key] for key in ('train_mask', 'val_mask', 'test_mask')]
+            for graph in dataset
+        ]
+
+    for function, kwargs in (
+            (utils.random_splits_mask, {'train_ratio': 0.2, 'val_ratio': 0.4}),
+            (utils.random_splits_mask_class, {'num_train_per_class': 2, 'num_val_per_class': 3})
+    ):
+        for seed in (0, None):
+            serial = masks(function, 0, seed=seed, **kwargs)
+            parallel = masks(function, 2, seed=seed, **kwargs)
+            for serial_masks, parallel_masks in zip(serial, parallel):
+                for serial_mask, parallel_mask in zip(serial_masks, parallel_masks):
+                    assert torch.equal(serial_mask, parallel_mask)
+
+if __name__ == '__main__':
+    test_random_splits_mask_class()
+    test_random_splits_num_workers()
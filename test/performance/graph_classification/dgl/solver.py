@@ -5,11 +5,14 @@ Performance check of AutoGL Solver
 import os
 os.environ["AUTOGL_BACKEND"] = "dgl"
 
-import random
+import time
 import numpy as np
-from tqdm import tqdm
+import torch
+import torch.multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
 
 from autogl.solver import AutoGraphClassifier
+from autogl.module.train import GraphClassificationFullTrainer
 from autogl.datasets import build_dataset_from_name
 from autogl.solver.utils import set_seed
 from helper import get_encoder_decoder_hp
@@ -24,6 +27,39 @@ def fixed(**kwargs):
         "value": v
     } for k, v in kwargs.items()]
 
+# dataset shared by every run of a worker process, sent once on worker start
+_shared = {}
+
+def init_worker(dataset, labels, allow_tf32=False, device='cuda', device_ids=None):
+    _shared['dataset'] = dataset
+    _shared['labels'] = labels
+    if device_ids is not None:
+        # pin the whole worker process to one gpu, so it opens a single cuda context
+        device = 'cuda:{}'.format(device_ids.get())
+        torch.cuda.set_device(device)
+    _shared['device'] = device
+    if allow_tf32:
+        torch.backends.cuda.matmul.allow_tf32 = True
+        torch.backends.cudnn.allow_tf32 = True
+
+def run(seed, graph_model, trainer_hp_space, model_hp_spaces, device_resident=False, autocast=False):
+    dataset, labels, device = _shared['dataset'], _shared['labels'], _shared['device']
+    solver = AutoGraphClassifier(
+        feature_module=None,
+        graph_models=[graph_model],
+        hpo_module='random',
+        ensemble_module=None,
+        default_trainer=GraphClassificationFullTrainer(
+            init=False, device_resident=device_resident, autocast=autocast
+        ),
+        device=device, max_evals=1,
+        trainer_hp_space=trainer_hp_space,
+        model_hp_spaces=model_hp_spaces
+    )
+    solver.fit(dataset, evaluation_method=['acc'], seed=seed)
+    out = solver.predict(dataset, mask='test').astype(np.uint8, copy=False)
+    return np.count_nonzero(out == labels) / labels.size
+
 if __name__ == '__main__':
 
     import argparse
@@ -36,23 +72,29 @@ if __name__ == '__main__':
     parser.add_argument('--model', type=str, choices=['gin', 'gat', 'gcn', 'sage'], default='gin')
     parser.add_argument('--lr', type=float, default=0.0001)
     parser.add_argument('--epoch', type=int, default=100)
+    parser.add_argument('--num_workers', type=int, default=None, help='number of processes running the repeats in parallel, each pinned to one of the visible gpus when --device is cuda; defaults to the number of gpus for --device cuda and 1 otherwise')
+    parser.add_argument('--allow_tf32', action='store_true', help='use tf32 for matmul and cudnn convolutions on ampere or newer gpus')
+    parser.add_argument('--device_resident', action='store_true', help='keep each dataset split on the device instead of copying every batch')
+    parser.add_argument('--autocast', action='store_true', help='train under bfloat16 autocast on cuda, requires torch>=1.10')
 
     args = parser.parse_args()
+    if args.num_workers is None:
+        args.num_workers = torch.cuda.device_count() if args.device == 'cuda' and torch.cuda.is_available() else 1
 
     # seed = 100
     dataset = build_dataset_from_name(args.dataset.lower())
     
     # 1. split dataset [fix split]
-    dataids = list(range(len(dataset)))
-    random.seed(args.dataset_seed)
-    random.shuffle(dataids)
+    num_graphs = len(dataset)
+    dataids = np.random.default_rng(args.dataset_seed).permutation(num_graphs)
     
-    fold = int(len(dataset) * 0.1)
-    dataset.train_index = dataids[:fold * 8]
-    dataset.val_index = dataids[fold * 8: fold * 9]
-    dataset.test_index = dataids[fold * 9: ]
+    train_ids, val_ids, test_ids = np.split(dataids, [int(num_graphs * 0.8), int(num_graphs * 0.9)])
+    dataset.train_index = train_ids.tolist()
+    dataset.val_index = val_ids.tolist()
+    dataset.test_index = test_ids.tolist()
 
-    labels = np.array([x.data['label'].item() for x in dataset.test_split])
+    # every supported dataset has far fewer than 256 classes
+    labels = torch.cat([x.data['label'].view(-1) for x in dataset.test_split]).cpu().numpy().astype(np.uint8)
 
     if args.model == "gin":
         decoder = "JKSumPoolMLP"
@@ -60,27 +102,45 @@ if __name__ == '__main__':
         decoder = "sumpoolmlp"
 
     model_hp, decoder_hp = get_encoder_decoder_hp(args.model, decoder)
+    # the hp spaces are fixed, build them once for all the repeats
+    trainer_hp_space = fixed(**{
+            # hp from trainer
+            "max_epoch": args.epoch,
+            "batch_size": args.batch_size,
+            "early_stopping_round": args.epoch + 1,
+            "lr": args.lr,
+            "weight_decay": 0,
+    })
+    model_hp_spaces = [{"encoder": fixed(**model_hp), "decoder": fixed(**decoder_hp)}]
 
-    accs = []
-    for seed in tqdm(range(args.repeat)):
-        solver = AutoGraphClassifier(
-            feature_module=None,
-            graph_models=[(args.model, decoder)],
-            hpo_module='random',
-            ensemble_module=None,
-            device=args.device, max_evals=1,
-            trainer_hp_space = fixed(**{
-                    # hp from trainer
-                    "max_epoch": args.epoch,
-                    "batch_size": args.batch_size,
-                    "early_stopping_round": args.epoch + 1,
-                    "lr": args.lr,
-                    "weight_decay": 0,
-            }),
-            model_hp_spaces=[{"encoder": fixed(**model_hp), "decoder": fixed(**decoder_hp)}]
-        )
-        solver.fit(dataset, evaluation_method=['acc'], seed=seed)
-        out = solver.predict(dataset, mask='test')
-        acc = (out == labels).astype('float').mean()
-        accs.append(acc)
-    print('{:.2f} ~ {:.2f}'.format(np.mean(accs) * 100, np.std(accs) * 100))
+    seeds = list(range(args.repeat))
+    common_args = [(args.model, decoder), trainer_hp_space, model_hp_spaces, args.device_resident, args.autocast]
+
+    def report(results):
+        accs, start = np.empty(args.repeat), time.perf_counter()
+        for i, acc in enumerate(results):
+            accs[i] = acc
+            if (i + 1) % 10 == 0:
+                print('{}/{} {:.1f}s'.format(i + 1, args.repeat, time.perf_counter() - start))
+        return accs
+
+    if args.num_workers > 1:
+        context = mp.get_context('spawn')
+        with context.Manager() as manager:
+            device_ids = None
+            if args.device == 'cuda' and torch.cuda.device_count() > 1:
+                # every worker takes one gpu id when it starts, round-robin over the gpus
+                device_ids = manager.Queue()
+                for worker in range(args.num_workers):
+                    device_ids.put(worker % torch.cuda.device_count())
+            with ProcessPoolExecutor(
+                max_workers=args.num_workers, mp_context=context, initializer=init_worker,
+                initargs=(dataset, labels, args.allow_tf32, args.device, device_ids)
+            ) as executor:
+                accs = report(executor.map(
+                    run, seeds, *[[arg] * args.repeat for arg in common_args]
+                ))
+    else:
+        init_worker(dataset, labels, args.allow_tf32, args.device)
+        accs = report(run(seed, *common_args) for seed in seeds)
+    print('{:.2f} ~ {:.2f}'.format(accs.mean() * 100, accs.std() * 100))